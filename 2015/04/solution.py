@@ -1,4 +1,7 @@
 import hashlib
+import os
+
+from multiprocessing import Pool
 
 def find_number(secret_key, prefix="00000"):
     """
@@ -14,12 +17,95 @@ def find_number(secret_key, prefix="00000"):
             return i
         i += 1
 
+def split_prefix(prefix):
+    """
+    Convert a hex prefix into the raw digest bytes it
+    pins down, plus the value of the high nibble of the
+    following byte if the prefix has an odd length.
+    """
+    full_bytes = bytes.fromhex(prefix[:len(prefix) // 2 * 2])
+    nibble = int(prefix[-1], 16) if len(prefix) % 2 else None
+    return full_bytes, nibble
+
+def has_prefix(digest, full_bytes, nibble):
+    n = len(full_bytes)
+    return digest[:n] == full_bytes and (nibble is None or digest[n] >> 4 == nibble)
+
+def search_chunk(secret_key, prefixes, lo, hi):
+    """
+    Search the numbers in [lo, hi) for the smallest one
+    whose MD5 hash has each of the required prefixes. The
+    secret key is fed to the hash once and the hash state is
+    copied for every number, and the prefixes are checked on
+    the raw digest rather than on its hex representation.
+    Each digest is computed once and checked against every
+    prefix that has not matched yet.
+    """
+    patterns = [split_prefix(prefix) for prefix in prefixes]
+    matches = [None] * len(prefixes)
+    pending = len(prefixes)
+    base = hashlib.md5(secret_key.encode())
+    for i in range(lo, hi):
+        md5_hash = base.copy()
+        md5_hash.update(str(i).encode())
+        digest = md5_hash.digest()
+        for k, (full_bytes, nibble) in enumerate(patterns):
+            if matches[k] is None and has_prefix(digest, full_bytes, nibble):
+                matches[k] = i
+                pending -= 1
+        if not pending:
+            break
+    return matches
+
+def find_numbers(secret_key, prefixes, start=1, limit=None, chunk_size=50_000, processes=None):
+    """
+    Find the smallest number for each prefix in a single scan
+    over the numbers. The scan is split into chunks and each
+    worker process gets one chunk per round. A prefix is
+    resolved by the first round with any match for it, and
+    since rounds cover consecutive ranges the smallest match
+    in that round is the smallest number overall. Resolved
+    prefixes drop out of later rounds, so a longer prefix
+    simply continues from where a shorter one stopped.
+
+    With a limit, the scan stops after the round that reaches
+    it even if some prefixes are unresolved. Returns the smallest
+    number found for each resolved prefix and a checkpoint: every
+    number below the checkpoint has been checked against the
+    unresolved prefixes, so passing the checkpoint as start to a
+    later call with those prefixes resumes the scan. The answer
+    for "00000" is also a valid start for "000000", since any hash
+    with six leading zeros also has five.
+    """
+    processes = processes or os.cpu_count()
+    found = {}
+    pending = list(dict.fromkeys(prefixes))
+    lo = start
+    with Pool(processes) as pool:
+        while pending and (limit is None or lo < limit):
+            chunks = [
+                (secret_key, pending, lo + k * chunk_size, lo + (k + 1) * chunk_size)
+                for k in range(processes)
+            ]
+            results = pool.starmap(search_chunk, chunks)
+            for k, prefix in enumerate(pending):
+                matches = [result[k] for result in results if result[k] is not None]
+                if matches:
+                    found[prefix] = min(matches)
+            pending = [prefix for prefix in pending if prefix not in found]
+            lo += processes * chunk_size
+    return found, lo
+
+def find_number_parallel(secret_key, prefix="00000", start=1, chunk_size=50_000, processes=None):
+    """
+    Multi-process search for a single prefix.
+    """
+    found, _ = find_numbers(secret_key, [prefix], start, None, chunk_size, processes)
+    return found[prefix]
+
 if __name__ == "__main__":
     secret_key = "bgvyzdsv"
-    # hash starts with 5 zeros
-    number = find_number(secret_key, "00000")
-    print(number)
-
-    # hash starts with 6 zeros
-    number = find_number(secret_key, "000000")
-    print(number)
+    # hash starts with 5 zeros and hash starts with 6 zeros
+    numbers, _ = find_numbers(secret_key, ["00000", "000000"])
+    print(numbers["00000"])
+    print(numbers["000000"])
@@ -1,8 +1,11 @@
 import re
 import sys
 
+import numpy as np
+
 from dataclasses import dataclass
 from enum import Enum, auto
+from typing import Optional
 
 class Action(Enum):
     TOGGLE = "toggle"
@@ -17,28 +20,18 @@ class Instruction:
     end_x: int
     end_y: int
 
-class Light:
+@dataclass
+class LightGrid:
     """
-    Keep track of on/off status for regular light bulbs and
-    the brightness levels for lightbulbs with brightness
-    settings.
+    Array-backed light grid. Each cell of the on/off plane and
+    the brightness plane is either a single light or, for a
+    coordinate-compressed grid, a block of lights that always
+    share the same state. In the latter case, area holds the
+    number of lights in each block.
     """
-    def __init__(self):
-        self.on = False
-        self.brightness = 0
-
-    def turn_on(self):
-        self.on = True
-        self.brightness += 1
-    
-    def turn_off(self):
-        self.on = False
-        self.brightness -= 1
-        self.brightness = max(self.brightness, 0)
-
-    def toggle(self):
-        self.on = not self.on
-        self.brightness += 2
+    on: np.ndarray
+    brightness: np.ndarray
+    area: Optional[np.ndarray] = None
 
 def read_input(file):
     with open(file, "r") as f:
@@ -56,32 +49,73 @@ def read_input(file):
         instructions.append(instruction)
     return instructions
 
-def process_instructions(instructions, start=0, end=1000):
+def compress_coordinates(instructions, start, end, axis):
     """
-    Brute force: flip/toggle all light switches in the range
-    given by each line of instructions.
+    Collect the breakpoints along one axis at which some
+    instruction rectangle begins or ends. Consecutive
+    breakpoints bound a band of lights that every instruction
+    treats the same way.
     """
-    lights = {}
-    for i in range(start, end):
-        for j in range(start, end):
-            lights[complex(i, j)] = Light()
+    breakpoints = {start, end}
     for instruction in instructions:
-        for i in range(instruction.start_x, instruction.end_x+1):
-            for j in range(instruction.start_y, instruction.end_y+1):
-                coordinate = complex(i, j)
-                if instruction.action is Action.ON:
-                    lights[coordinate].turn_on()
-                elif instruction.action is Action.OFF:
-                    lights[coordinate].turn_off()
-                else:
-                    lights[coordinate].toggle()
+        if axis == "x":
+            breakpoints.update((instruction.start_x, instruction.end_x + 1))
+        else:
+            breakpoints.update((instruction.start_y, instruction.end_y + 1))
+    return np.array(sorted(b for b in breakpoints if start <= b <= end), dtype=np.int64)
+
+def process_instructions(instructions, start=0, end=1000, compress=False):
+    """
+    Flip/toggle all light switches in the range given by
+    each line of instructions. Each instruction covers a
+    rectangle of lights, so it is applied as a single slice
+    of the on/off and brightness planes.
+
+    With compress, the planes are indexed by the bands between
+    instruction breakpoints instead of by individual lights,
+    so memory grows with the number of instructions squared
+    rather than with the area of the start..end square.
+    """
+    if compress:
+        xs = compress_coordinates(instructions, start, end, "x")
+        ys = compress_coordinates(instructions, start, end, "y")
+        area = np.outer(np.diff(xs), np.diff(ys))
+    else:
+        xs = ys = np.arange(start, end + 1, dtype=np.int64)
+        area = None
+    lights = LightGrid(
+        np.zeros((len(xs) - 1, len(ys) - 1), dtype=np.uint8),
+        np.zeros((len(xs) - 1, len(ys) - 1), dtype=np.int32),
+        area,
+    )
+    for instruction in instructions:
+        rectangle = (
+            slice(*np.searchsorted(xs, (instruction.start_x, instruction.end_x + 1))),
+            slice(*np.searchsorted(ys, (instruction.start_y, instruction.end_y + 1))),
+        )
+        on = lights.on[rectangle]
+        brightness = lights.brightness[rectangle]
+        if instruction.action is Action.ON:
+            on[...] = 1
+            brightness += 1
+        elif instruction.action is Action.OFF:
+            on[...] = 0
+            brightness -= 1
+            np.maximum(brightness, 0, out=brightness)
+        else:
+            on ^= 1
+            brightness += 2
     return lights
 
 def count_lit_lights(lights):
-    return sum([light.on for light in lights.values()])
+    if lights.area is None:
+        return int(lights.on.sum())
+    return int((lights.on * lights.area).sum())
 
 def sum_light_brightness(lights):
-    return sum([light.brightness for light in lights.values()])
+    if lights.area is None:
+        return int(lights.brightness.sum())
+    return int((lights.brightness * lights.area).sum())
 
 if __name__ == "__main__":
     instructions = read_input(sys.argv[1])
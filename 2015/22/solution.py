@@ -1,6 +1,9 @@
-import copy
+import heapq
+import itertools
 
-from queue import PriorityQueue
+from dataclasses import dataclass
+from multiprocessing import Pool
+from typing import Dict, List, NamedTuple, Optional, Tuple
 
 class Character:
     """Base class for game characters"""
@@ -24,6 +27,7 @@ class Spell:
     cost = 0
     duration = 0
     damage = 0
+    heal = 0
     armor_bonus = 0
     mana_recovery = 0
     tick_rate = 1
@@ -53,6 +57,7 @@ class Spell:
             f"cost={self.cost},",
             f"duration={self.duration},",
             f"damage={self.damage},",
+            f"heal={self.heal},",
             f"armor_bonus={self.armor_bonus},",
             f"mana_recovery={self.mana_recovery},",
             f"tick_rate={self.tick_rate})"
@@ -151,10 +156,11 @@ class Drain(Spell):
     name = "Drain"
     cost = 73
     damage = 2
+    heal = 2
 
     def cast(self, caster: Character, target: Character):
         target.take_damage(self.damage)
-        caster.heal(self.damage)
+        caster.heal(self.heal)
 
 class Shield(Spell):
     """
@@ -204,25 +210,106 @@ class Recharge(Spell):
         caster.recover_mana(self.mana_recovery)
         self.duration -= self.tick_rate
 
-class State:
-    def __init__(self, player: Character, boss: Character):
-        self.player = player
-        self.boss = boss
+@dataclass(frozen=True)
+class SpellRule:
+    """
+    Spell reduced to the numbers that drive the search.
+    A spell without a duration applies its damage and heal
+    instantly on cast. A spell with a duration grants its
+    armor bonus while active and applies its damage and mana
+    recovery on every tick.
+    """
+    cost: int
+    duration: int
+    damage: int
+    heal: int
+    armor_bonus: int
+    mana_recovery: int
+
+    @classmethod
+    def from_spell(cls, spell: Spell) -> "SpellRule":
+        return cls(
+            spell.cost,
+            spell.__class__.duration,
+            spell.damage,
+            spell.heal,
+            spell.armor_bonus,
+            spell.mana_recovery,
+        )
+
+class GameState(NamedTuple):
+    """
+    Hashable snapshot of a game between turns. Timers hold
+    the remaining duration of each spell in the spellbook,
+    with zero meaning the spell is not in effect.
+    """
+    mana_spent: int
+    hp: int
+    mana: int
+    boss_hp: int
+    timers: Tuple[int, ...]
+
+@dataclass(frozen=True)
+class SpellTable:
+    """
+    Compiled spellbook. Effects maps every possible set of
+    spell timers to the outcome of one tick: the damage dealt
+    to the boss, the mana recovered, the player's armor for the
+    rest of the turn and the timers after ticking down.
+    """
+    rules: Tuple[SpellRule, ...]
+    effects: Dict[Tuple[int, ...], Tuple[int, int, int, Tuple[int, ...]]]
 
-    def __lt__(self, other: "State"):
-        return self.player.mana_spent < other.player.mana_spent
+def tick_timers(
+        rules: Tuple[SpellRule, ...],
+        timers: Tuple[int, ...]
+    ) -> Tuple[int, int, int, Tuple[int, ...]]:
+    """
+    Apply one tick of every spell in effect and tick down
+    the timers.
+    """
+    damage = 0
+    mana_recovery = 0
+    armor = 0
+    new_timers = list(timers)
+    for k, timer in enumerate(timers):
+        if timer:
+            rule = rules[k]
+            damage += rule.damage
+            mana_recovery += rule.mana_recovery
+            new_timers[k] = timer - 1
+            if new_timers[k]:
+                armor += rule.armor_bonus
+    return damage, mana_recovery, armor, tuple(new_timers)
+
+def compile_spellbook(spellbook: List[Spell]) -> SpellTable:
+    """
+    Build the rules for each spell from its class attributes
+    and precompute the effect tick for every combination of
+    timers, so the search only does table lookups.
+    """
+    rules = tuple(SpellRule.from_spell(spell) for spell in spellbook)
+    effects = {}
+    for timers in itertools.product(*(range(rule.duration + 1) for rule in rules)):
+        effects[timers] = tick_timers(rules, timers)
+    return SpellTable(rules, effects)
 
-    def __repr__(self):
-        return f"State(player={self.player}, boss={self.boss})"
+def default_spellbook() -> List[Spell]:
+    # this is the wizard's spellbook containing spells that have
+    # their full durations
+    return [MagicMissile(), Drain(), Shield(), Poison(), Recharge()]
 
 def find_win_with_lowest_mana_cost(
         player: Player,
         boss: Boss,
-        hard_mode: bool = False
-    ) -> State:
+        hard_mode: bool = False,
+        table: Optional[SpellTable] = None
+    ) -> Optional[GameState]:
     """
     Use Dijkstra's algorithm to find the win that requires the
-    least mana expense by the player.
+    least mana expense by the player. Game states are plain
+    tuples, so they are cheap to create and a closed set keeps
+    identical states from being expanded more than once.
 
     Order of events:
     - if hard mode, player takes one damage
@@ -231,71 +318,121 @@ def find_win_with_lowest_mana_cost(
       spells
     - player takes turn and can cast spells that are not already
       in effect
+    - apply persistent effects again
     - boss attacks the player
     """
-    # this is the wizard's spellbook containing spells that have
-    # their full durations
-    spellbook = [MagicMissile(), Drain(), Shield(), Poison(), Recharge()]
+    if table is None:
+        table = compile_spellbook(default_spellbook())
+    rules = table.rules
+    effects = table.effects
 
-    state = State(player, boss)
-    heap = PriorityQueue()
-    heap.put(state)
+    state = GameState(0, player.hp, player.mana, boss.hp, (0,) * len(rules))
+    heap = [state]
+    closed = set()
 
-    while not heap.empty():
-        state = heap.get()
-        # clone the characters to avoid modifying other game states
-        player = copy.deepcopy(state.player)
-        boss = copy.deepcopy(state.boss)
+    while heap:
+        state = heapq.heappop(heap)
+        mana_spent, hp, mana, boss_hp, timers = state
 
         # check for lowest cost boss defeat
-        if boss.is_defeated:
+        if boss_hp <= 0:
             return state
 
+        if state[1:] in closed:
+            continue
+        closed.add(state[1:])
+
         if hard_mode:
-            player.take_damage(1)
+            hp -= 1
 
         # if player was defeated, toss this game state
-        if player.is_defeated:
+        if hp <= 0:
             continue
 
         # tick active spells
         # spells can expire and then be recast immediately!
-        # stuff like mana recovery or damage ticks happen here
-        player.tick_spells(boss)
+        damage, mana_recovery, _, timers = effects[timers]
+        boss_hp -= damage
+        mana += mana_recovery
+        # the effects can defeat the boss before the player has to
+        # cast, which wins without spending any more mana
+        if boss_hp <= 0:
+            heapq.heappush(heap, GameState(mana_spent, hp, mana, boss_hp, timers))
+            continue
 
         # try out each spell
-        for spell in spellbook:
-            # lose if cannot cast any spells
-            if player.mana < spell.cost:
-                continue
-            else:
-                # activate the spell for casting
-                spell = copy.deepcopy(spell)
-
-            # spell has not completed, so do not recast it
-            if player.spell_unavailable(spell):
+        for k, rule in enumerate(rules):
+            # spell is unaffordable or has not completed
+            if rule.cost > mana or timers[k]:
                 continue
 
-            # clone the characters to avoid modifying other game states
-            new_player = copy.deepcopy(player)
-            new_boss = copy.deepcopy(boss)
-
             # player action
-            new_player.cast_spell(new_boss, spell)
+            new_hp = hp
+            new_boss_hp = boss_hp
+            new_timers = timers
+            if rule.duration:
+                new_timers = timers[:k] + (rule.duration,) + timers[k + 1:]
+            else:
+                new_boss_hp -= rule.damage
+                new_hp += rule.heal
 
             # boss action
-            new_player.tick_spells(new_boss)
-            new_boss.attack(new_player)
+            damage, mana_recovery, armor, new_timers = effects[new_timers]
+            new_boss_hp -= damage
+            if new_boss_hp > 0:
+                new_hp -= max(1, boss.damage - armor)
 
             # put new game state in the heap
-            new_state = State(new_player, new_boss)
-            heap.put(new_state)
+            new_state = GameState(
+                mana_spent + rule.cost,
+                new_hp,
+                mana - rule.cost + mana_recovery,
+                new_boss_hp,
+                new_timers,
+            )
+            heapq.heappush(heap, new_state)
+    return None
+
+# spell table shared by all searches in a worker process
+WORKER_SPELL_TABLE = None
+
+def init_worker(table: SpellTable):
+    global WORKER_SPELL_TABLE
+    WORKER_SPELL_TABLE = table
+
+def search_boss(
+        player_stats: Tuple[int, int],
+        boss_stats: Tuple[int, int],
+        hard_mode: bool
+    ) -> Optional[GameState]:
+    return find_win_with_lowest_mana_cost(
+        Player(*player_stats), Boss(*boss_stats), hard_mode, WORKER_SPELL_TABLE
+    )
+
+def find_wins_for_bosses(
+        player: Player,
+        bosses: List[Boss],
+        hard_mode: bool = False,
+        processes: Optional[int] = None
+    ) -> List[Optional[GameState]]:
+    """
+    Find the lowest mana cost win against each of many bosses.
+    The spellbook is compiled once and handed to each worker
+    process when it starts, and the searches themselves only
+    ship the (hp, damage) stats of the characters. Results are
+    in the same order as the bosses, with None for bosses that
+    cannot be beaten.
+    """
+    table = compile_spellbook(default_spellbook())
+    tasks = [((player.hp, player.mana), (boss.hp, boss.damage), hard_mode) for boss in bosses]
+    with Pool(processes, initializer=init_worker, initargs=(table,)) as pool:
+        return pool.starmap(search_boss, tasks)
 
 if __name__ == "__main__":
     boss = Boss(51, 9)
     player = Player(50, 500)
     state = find_win_with_lowest_mana_cost(player, boss)
-    print(state.player.mana_spent)
+    print(state.mana_spent)
 
     state = find_win_with_lowest_mana_cost(player, boss, True)
-    print(state.player.mana_spent)
+    print(state.mana_spent)
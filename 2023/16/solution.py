@@ -3,7 +3,8 @@ import sys
 from collections import deque
 from dataclasses import dataclass
 from enum import Enum
-from typing import List
+from multiprocessing import Pool
+from typing import Dict, List, Tuple
 
 class Direction(Enum):
     UP = (-1, 0)
@@ -150,10 +151,187 @@ def maximize_energized_spaces(grid):
         most_energized = max(most_energized, n_energized)
     return most_energized
 
+def trace_segment(grid: List[List[str]], state: State) -> Tuple[int, List[State]]:
+    """
+    Follow a beam from a state through empty spaces and mirrors
+    until it either leaves the grid or reaches a splitter. Returns
+    the energized spaces as a bitset (bit row * n_cols + col) and
+    the states in which the beam leaves the splitter, if any.
+
+    Beam paths through mirrors can be retraced backwards, so a beam
+    that started at the boundary or at a splitter cannot get stuck
+    in a loop of mirrors.
+    """
+    n_rows = len(grid)
+    n_cols = len(grid[0])
+    row = state.row
+    col = state.col
+    direction = state.direction
+    cells = 0
+    while True:
+        row += direction.drow
+        col += direction.dcol
+        if not (0 <= row < n_rows and 0 <= col < n_cols):
+            return cells, []
+        cells |= 1 << (row * n_cols + col)
+        space = grid[row][col]
+        if space in {"|", "-"}:
+            return cells, [State(row, col, new_direction) for new_direction in split_beam(direction, space)]
+        elif space in {"\\", "/"}:
+            direction = reflect_beam(direction, space)
+        elif space != ".":
+            raise ValueError("Not a valid space type.")
+
+@dataclass
+class BeamGraph:
+    """
+    Graph with a node for each state in which a beam leaves a
+    splitter. reach[node] is the bitset of spaces energized by a
+    beam that leaves the splitter in that state.
+    """
+    nodes: Dict[State, int]
+    reach: List[int]
+
+def build_beam_graph(grid: List[List[str]]) -> BeamGraph:
+    """
+    Trace the segment from each splitter node to the next splitter,
+    which gives the spaces the segment energizes and the splitter
+    nodes it leads to.
+
+    Beams can go around in circles between splitters, so the nodes
+    are grouped into strongly connected components (Tarjan's
+    algorithm, iteratively). All nodes in a component energize the
+    same spaces: those of the component's own segments and everything
+    the components it leads to energize. Tarjan's algorithm completes
+    the components that a component leads to before the component
+    itself, so each component's bitset is a union over bitsets that
+    are already known.
+    """
+    nodes = {}
+    for row in range(len(grid)):
+        for col in range(len(grid[0])):
+            if grid[row][col] == "|":
+                directions = [Direction.UP, Direction.DOWN]
+            elif grid[row][col] == "-":
+                directions = [Direction.LEFT, Direction.RIGHT]
+            else:
+                continue
+            for direction in directions:
+                nodes[State(row, col, direction)] = len(nodes)
+    cells = []
+    successors = []
+    for state in nodes:
+        segment_cells, next_states = trace_segment(grid, state)
+        cells.append(segment_cells)
+        successors.append([nodes[next_state] for next_state in next_states])
+
+    n_nodes = len(nodes)
+    index = [-1] * n_nodes
+    lowlink = [0] * n_nodes
+    on_stack = [False] * n_nodes
+    components = [-1] * n_nodes
+    component_reach = []
+    stack = []
+    counter = 0
+    for root in range(n_nodes):
+        if index[root] >= 0:
+            continue
+        # each frame is a node and the position of its next successor
+        frames = [(root, 0)]
+        while frames:
+            node, k = frames.pop()
+            if k == 0:
+                index[node] = lowlink[node] = counter
+                counter += 1
+                stack.append(node)
+                on_stack[node] = True
+            else:
+                # returning from the successor visited last
+                lowlink[node] = min(lowlink[node], lowlink[successors[node][k-1]])
+            while k < len(successors[node]):
+                successor = successors[node][k]
+                if index[successor] < 0:
+                    break
+                if on_stack[successor]:
+                    lowlink[node] = min(lowlink[node], index[successor])
+                k += 1
+            if k < len(successors[node]):
+                frames.append((node, k + 1))
+                frames.append((successors[node][k], 0))
+                continue
+            if lowlink[node] == index[node]:
+                component = len(component_reach)
+                members = []
+                while True:
+                    member = stack.pop()
+                    on_stack[member] = False
+                    components[member] = component
+                    members.append(member)
+                    if member == node:
+                        break
+                reach = 0
+                for member in members:
+                    reach |= cells[member]
+                    for successor in successors[member]:
+                        if components[successor] != component:
+                            reach |= component_reach[components[successor]]
+                component_reach.append(reach)
+    return BeamGraph(nodes, [component_reach[components[node]] for node in range(n_nodes)])
+
+def energize_grid_from_graph(grid: List[List[str]], beam_graph: BeamGraph, start_state: State) -> int:
+    """
+    Same count as energize_grid, but only the segment from the start
+    state to the first splitter is traced. The rest comes from the
+    precomputed beam graph.
+    """
+    energized, next_states = trace_segment(grid, start_state)
+    for state in next_states:
+        energized |= beam_graph.reach[beam_graph.nodes[state]]
+    return bin(energized).count("1")
+
+def maximize_energized_spaces_from_graph(grid):
+    beam_graph = build_beam_graph(grid)
+    start_states = generate_start_states_from_boundaries(grid)
+    most_energized = -sys.maxsize
+    for state in start_states:
+        n_energized = energize_grid_from_graph(grid, beam_graph, state)
+        most_energized = max(most_energized, n_energized)
+    return most_energized
+
+# grid and beam graph shared by all tasks in a worker process
+WORKER_GRID = None
+WORKER_BEAM_GRAPH = None
+
+def init_worker(grid: List[List[str]], beam_graph: BeamGraph):
+    global WORKER_GRID, WORKER_BEAM_GRAPH
+    WORKER_GRID = grid
+    WORKER_BEAM_GRAPH = beam_graph
+
+def energize_start_state(start_state: State) -> Tuple[State, int]:
+    return start_state, energize_grid_from_graph(WORKER_GRID, WORKER_BEAM_GRAPH, start_state)
+
+def maximize_energized_spaces_parallel(grid, processes=None) -> Tuple[int, Dict[State, int]]:
+    """
+    Distribute the boundary start states over worker processes.
+    The grid and its beam graph are handed to each worker once when
+    it starts, so tasks only carry a start state. Results stream
+    back as they finish to keep a running maximum. Also returns the
+    number of energized spaces for every start state.
+    """
+    beam_graph = build_beam_graph(grid)
+    start_states = generate_start_states_from_boundaries(grid)
+    most_energized = -sys.maxsize
+    counts = {}
+    with Pool(processes, initializer=init_worker, initargs=(grid, beam_graph)) as pool:
+        for state, n_energized in pool.imap_unordered(energize_start_state, start_states, chunksize=16):
+            counts[state] = n_energized
+            most_energized = max(most_energized, n_energized)
+    return most_energized, counts
+
 if __name__ == "__main__":
     grid = read_input(sys.argv[1])
     n_energized = energize_grid(grid, State(0, -1, Direction.RIGHT))
     print(n_energized)
     
-    max_energized = maximize_energized_spaces(grid)
+    max_energized, _ = maximize_energized_spaces_parallel(grid)
     print(max_energized)
\ No newline at end of file
@@ -114,6 +114,192 @@ def roll_with_least_heat_lost(grid, ultra_crucible=False):
                 else:
                     heap.put(State(new_heat, new_row, new_col, new_direction, 1))
 
+def roll_with_least_heat_lost_dial(grid, ultra_crucible=False):
+    """
+    Same search as roll_with_least_heat_lost, but each state
+    (row, col, direction, run length) is encoded as a single
+    integer that indexes a preallocated list of the least heat
+    lost so far. Since the heat lost per move is a small
+    integer, the heap is replaced by a bucket queue (Dial's
+    algorithm) with one bucket per remainder of the heat lost,
+    which is enough because no move loses more heat than there
+    are buckets.
+
+    Unlike the original search, the ultra crucible must also
+    have rolled the minimum number of steps before it can stop
+    at the target.
+
+    This is the slower step-by-step reference for
+    roll_with_least_heat_lost_segments. It still takes seconds on
+    grids larger than 141x141, and __main__ does not use it.
+    """
+    rows = len(grid)
+    cols = len(grid[0])
+    heat = [value for line in grid for value in line]
+    if ultra_crucible:
+        min_consecutive_steps = MIN_CONSECUTIVE_STEPS_ULTRA
+        max_consecutive_steps = MAX_CONSECUTIVE_STEPS_ULTRA
+    else:
+        min_consecutive_steps = 1
+        max_consecutive_steps = MAX_CONSECUTIVE_STEPS
+    directions = list(Direction)
+    n_runs = max_consecutive_steps + 1
+    # states per position
+    stride = len(directions) * n_runs
+    # (direction, run length, state offset within the position) that
+    # can follow each (direction, run length) pair
+    moves = [
+        [
+            tuple(
+                (
+                    directions.index(new_direction),
+                    new_run,
+                    directions.index(new_direction) * n_runs + new_run,
+                )
+                for new_direction in direction.get_next_direction(run, ultra_crucible)
+                for new_run in [run + 1 if new_direction is direction else 1]
+            )
+            for run in range(n_runs)
+        ]
+        for direction in directions
+    ]
+    # position reached by one step in each direction, or -1 if out of bounds
+    neighbors = []
+    for row in range(rows):
+        for col in range(cols):
+            for direction in directions:
+                new_row = row + direction.drow
+                new_col = col + direction.dcol
+                if is_move_in_bounds(grid, new_row, new_col):
+                    neighbors.append(new_row * cols + new_col)
+                else:
+                    neighbors.append(-1)
+    # a list rather than an array, since reading from an array
+    # creates a new int object every time
+    best = [sys.maxsize] * (rows * cols * stride)
+    n_buckets = max(heat) + 1
+    buckets = [[] for _ in range(n_buckets)]
+    target = rows * cols - 1
+
+    n_pending = 0
+    for direction in (Direction.RIGHT, Direction.DOWN):
+        row, col = direction.drow, direction.dcol
+        if is_move_in_bounds(grid, row, col):
+            position = row * cols + col
+            new_direction = directions.index(direction)
+            state = position * stride + new_direction * n_runs + 1
+            best[state] = heat[position]
+            buckets[heat[position] % n_buckets].append((state, position, new_direction, 1))
+            n_pending += 1
+
+    heat_lost = 0
+    while n_pending:
+        bucket = buckets[heat_lost % n_buckets]
+        while bucket:
+            # states are queued along with their decoded fields
+            state, position, direction, run = bucket.pop()
+            n_pending -= 1
+            if best[state] != heat_lost:
+                # a state with less heat lost was found after this one was queued
+                continue
+            if position == target and run >= min_consecutive_steps:
+                # reached target with minimum heat lost
+                return heat_lost
+            position_neighbors = position * len(directions)
+            for new_direction, new_run, offset in moves[direction][run]:
+                new_position = neighbors[position_neighbors + new_direction]
+                if new_position < 0:
+                    continue
+                new_state = new_position * stride + offset
+                new_heat = heat_lost + heat[new_position]
+                if new_heat < best[new_state]:
+                    best[new_state] = new_heat
+                    buckets[new_heat % n_buckets].append((new_state, new_position, new_direction, new_run))
+                    n_pending += 1
+        heat_lost += 1
+
+def roll_with_least_heat_lost_segments(grid, ultra_crucible=False):
+    """
+    Same search as roll_with_least_heat_lost_dial, but each move
+    jumps straight to a point where the crucible may turn next,
+    i.e. anywhere from the minimum to the maximum number of
+    consecutive steps away along a line at a right angle to the
+    previous move. The heat lost along the way comes from prefix
+    sums over each row and column of the grid.
+
+    Because every move ends at a turn point, the run length no
+    longer needs to be tracked and the state collapses to the
+    position and the axis (vertical or horizontal) of the last
+    move, encoded as position * 2 + axis.
+    """
+    rows = len(grid)
+    cols = len(grid[0])
+    if ultra_crucible:
+        min_consecutive_steps = MIN_CONSECUTIVE_STEPS_ULTRA
+        max_consecutive_steps = MAX_CONSECUTIVE_STEPS_ULTRA
+    else:
+        min_consecutive_steps = 1
+        max_consecutive_steps = MAX_CONSECUTIVE_STEPS
+    # row_sums[row][col] is the heat lost in grid[row][:col]
+    row_sums = [[0] * (cols + 1) for _ in range(rows)]
+    # col_sums[col][row] is the heat lost in grid[:row][col]
+    col_sums = [[0] * (rows + 1) for _ in range(cols)]
+    for row in range(rows):
+        for col in range(cols):
+            row_sums[row][col + 1] = row_sums[row][col] + grid[row][col]
+            col_sums[col][row + 1] = col_sums[col][row] + grid[row][col]
+
+    best = [sys.maxsize] * (rows * cols * 2)
+    n_buckets = max(max(line) for line in grid) * max_consecutive_steps + 1
+    buckets = [[] for _ in range(n_buckets)]
+    target = rows * cols - 1
+
+    # the crucible can start off along either axis
+    for axis in (0, 1):
+        best[axis] = 0
+        buckets[0].append(axis)
+    n_pending = 2
+
+    heat_lost = 0
+    while n_pending:
+        bucket = buckets[heat_lost % n_buckets]
+        while bucket:
+            state = bucket.pop()
+            n_pending -= 1
+            if best[state] != heat_lost:
+                # a state with less heat lost was found after this one was queued
+                continue
+            position, axis = divmod(state, 2)
+            if position == target:
+                # reached target with minimum heat lost
+                return heat_lost
+            row, col = divmod(position, cols)
+            moves = []
+            if axis == 0:
+                # last move was vertical, so roll left or right
+                sums = row_sums[row]
+                for steps in range(min_consecutive_steps, max_consecutive_steps + 1):
+                    if col + steps < cols:
+                        moves.append((position + steps, sums[col + steps + 1] - sums[col + 1]))
+                    if col - steps >= 0:
+                        moves.append((position - steps, sums[col] - sums[col - steps]))
+            else:
+                # last move was horizontal, so roll up or down
+                sums = col_sums[col]
+                for steps in range(min_consecutive_steps, max_consecutive_steps + 1):
+                    if row + steps < rows:
+                        moves.append((position + steps * cols, sums[row + steps + 1] - sums[row + 1]))
+                    if row - steps >= 0:
+                        moves.append((position - steps * cols, sums[row] - sums[row - steps]))
+            for new_position, heat in moves:
+                new_state = new_position * 2 + (1 - axis)
+                new_heat = heat_lost + heat
+                if new_heat < best[new_state]:
+                    best[new_state] = new_heat
+                    buckets[new_heat % n_buckets].append(new_state)
+                    n_pending += 1
+        heat_lost += 1
+
 def is_done_rolling(grid, row, col):
     """reached target (bottom right corner)"""
     return (row == len(grid)-1 and col == len(grid[0])-1)
@@ -130,8 +316,8 @@ def read_input(input: str) -> List[List[str]]:
 
 if __name__ == "__main__":
     grid = read_input(sys.argv[1])
-    heat_lost = roll_with_least_heat_lost(grid)
+    heat_lost = roll_with_least_heat_lost_segments(grid)
     print(heat_lost)
 
-    heat_lost = roll_with_least_heat_lost(grid, ultra_crucible=True)
+    heat_lost = roll_with_least_heat_lost_segments(grid, ultra_crucible=True)
     print(heat_lost)
@@ -1,6 +1,8 @@
 import dataclasses
 import sys
 
+import numpy as np
+
 from dataclasses import dataclass
 from typing import List, Tuple
 
@@ -77,6 +79,90 @@ def can_accept_part(part, workflows):
                     workflow = workflows[rule.action]
                     break
 
+# field indices of the rating categories
+FIELDS = {"x": 0, "m": 1, "a": 2, "s": 3}
+
+# operator flags of compiled rules
+LESS = 0
+GREATER = 1
+ALWAYS = 2
+
+# jump targets of compiled rules that end the evaluation
+ACCEPT = -1
+REJECT = -2
+
+@dataclass
+class CompiledWorkflows:
+    """
+    All rules of all workflows flattened into parallel arrays.
+    Rule i compares field fields[i] against thresholds[i] using
+    operations[i]. If the rule passes, evaluation jumps to rule
+    on_pass[i], which is either the first rule of another workflow,
+    ACCEPT or REJECT. Otherwise evaluation falls through to rule
+    i + 1, which is the next rule of the same workflow since the
+    last rule of every workflow always passes.
+    """
+    fields: np.ndarray
+    operations: np.ndarray
+    thresholds: np.ndarray
+    on_pass: np.ndarray
+    start: int
+
+def compile_workflows(workflows, name="in"):
+    """
+    Lay out the rules of every workflow one after another and
+    resolve the actions of the rules into jump targets.
+    """
+    offsets = {}
+    n_rules = 0
+    for workflow in workflows.values():
+        offsets[workflow.name] = n_rules
+        n_rules += len(workflow.rules)
+    jumps = {"A": ACCEPT, "R": REJECT, **offsets}
+
+    fields = np.zeros(n_rules, dtype=np.int64)
+    operations = np.full(n_rules, ALWAYS, dtype=np.int8)
+    thresholds = np.zeros(n_rules, dtype=np.int64)
+    on_pass = np.zeros(n_rules, dtype=np.int64)
+    for workflow in workflows.values():
+        for i, rule in enumerate(workflow.rules, offsets[workflow.name]):
+            on_pass[i] = jumps[rule.action]
+            if rule.is_default:
+                continue
+            fields[i] = FIELDS[rule.target]
+            operations[i] = LESS if rule.operation == "<" else GREATER
+            thresholds[i] = rule.threshold
+    return CompiledWorkflows(fields, operations, thresholds, on_pass, offsets[name])
+
+def parts_to_array(parts: List[Part]) -> np.ndarray:
+    return np.array([(part.x, part.m, part.a, part.s) for part in parts], dtype=np.int64).reshape(-1, 4)
+
+def classify_ratings(ratings: np.ndarray, compiled: CompiledWorkflows) -> np.ndarray:
+    """
+    Vectorized version of can_accept_part for an (N, 4) array
+    of x/m/a/s ratings. Every part that is still being evaluated
+    advances by one rule per iteration, and parts drop out as
+    soon as they are accepted or rejected.
+    """
+    accepted = np.zeros(len(ratings), dtype=bool)
+    index = np.arange(len(ratings))
+    node = np.full(len(ratings), compiled.start, dtype=np.int64)
+    while index.size:
+        operations = compiled.operations[node]
+        values = ratings[index, compiled.fields[node]]
+        thresholds = compiled.thresholds[node]
+        passed = (
+            (operations == ALWAYS)
+            | ((operations == LESS) & (values < thresholds))
+            | ((operations == GREATER) & (values > thresholds))
+        )
+        node = np.where(passed, compiled.on_pass[node], node + 1)
+        accepted[index[node == ACCEPT]] = True
+        pending = node >= 0
+        index = index[pending]
+        node = node[pending]
+    return accepted
+
 @dataclass
 class RatingIntervals:
     x: Tuple[int, int] = (1, 4000)
@@ -165,6 +251,69 @@ def count_valid_combinations(name, workflows, intervals):
         valid_combinations += count_valid_combinations(default_rule.action, workflows, intervals)
     return valid_combinations
 
+# a 4-D box of ratings as (low, high) intervals in x/m/a/s order
+Box = Tuple[Tuple[int, int], ...]
+FULL_BOX = ((1, 4000),) * 4
+
+def box_combinations(box: Box) -> int:
+    combinations = 1
+    for low, high in box:
+        combinations *= max(0, high - low + 1)
+    return combinations
+
+def intersect_boxes(box: Box, other: Box) -> Box:
+    return tuple((max(a[0], b[0]), min(a[1], b[1])) for a, b in zip(box, other))
+
+def find_accepted_boxes(name, workflows, box=FULL_BOX, memo=None) -> Tuple[Box, ...]:
+    """
+    Same depth-first search as count_valid_combinations, but on
+    plain tuples, and collecting the accepted boxes instead of
+    only counting them. Workflows that are reached again with an
+    identical box reuse the boxes found the first time.
+
+    The returned boxes are disjoint, so the number of accepted
+    combinations within any box is the sum of the sizes of its
+    intersections with the accepted boxes.
+    """
+    if memo is None:
+        memo = {}
+    key = (name, box)
+    if key in memo:
+        return memo[key]
+
+    def follow(action, box):
+        if action == "A":
+            return (box,)
+        elif action == "R":
+            return ()
+        return find_accepted_boxes(action, workflows, box, memo)
+
+    workflow = workflows[name]
+    accepted = []
+    for rule in workflow.rules:
+        if rule.is_default:
+            accepted.extend(follow(rule.action, box))
+            break
+        field = FIELDS[rule.target]
+        low, high = box[field]
+        if rule.operation == "<":
+            passed = (low, min(high, rule.threshold - 1))
+            failed = (max(low, rule.threshold), high)
+        else:
+            passed = (max(low, rule.threshold + 1), high)
+            failed = (low, min(high, rule.threshold))
+        if passed[0] <= passed[1]:
+            accepted.extend(follow(rule.action, box[:field] + (passed,) + box[field + 1:]))
+        # nothing is left for the remaining rules
+        if failed[0] > failed[1]:
+            break
+        box = box[:field] + (failed,) + box[field + 1:]
+    memo[key] = tuple(accepted)
+    return memo[key]
+
+def count_accepted_in_box(accepted_boxes: Tuple[Box, ...], box: Box = FULL_BOX) -> int:
+    return sum(box_combinations(intersect_boxes(accepted, box)) for accepted in accepted_boxes)
+
 def parse_parts(part_text: str) -> List[Part]:
     part_lines = part_text.splitlines()
     parts = []
@@ -210,13 +359,11 @@ def read_input(input: str):
 
 if __name__ == "__main__":
     parts, workflows = read_input(sys.argv[1])
-    rating_sum = 0
-    for part in parts:
-        accepted = can_accept_part(part, workflows)
-        if accepted:
-            rating_sum += part.rating_sum
+    ratings = parts_to_array(parts)
+    accepted = classify_ratings(ratings, compile_workflows(workflows))
+    rating_sum = int(ratings[accepted].sum())
     print(rating_sum)
 
-    intervals = RatingIntervals()
-    valid_combinations = count_valid_combinations("in", workflows, intervals)
+    accepted_boxes = find_accepted_boxes("in", workflows)
+    valid_combinations = count_accepted_in_box(accepted_boxes)
     print(valid_combinations)   
\ No newline at end of file
@@ -2,6 +2,7 @@ import math
 import sys
 
 from abc import ABC, abstractmethod
+from collections import deque
 from dataclasses import dataclass
 from enum import Enum
 from queue import Queue
@@ -193,34 +194,179 @@ def push_button_until_target(
         count += 1
     return count
 
+class Network:
+    """
+    Compiled form of the module network. Module names are
+    mapped to integer ids, flip-flop states live in a bytearray
+    and each conjunction remembers its inputs as a bitmask along
+    with the number of inputs whose last pulse was HIGH. Pulses
+    are (sender, receiver, pulse) triples of ints in a deque.
+    """
+
+    FLIPFLOP = 0
+    CONJUNCTION = 1
+    BROADCAST = 2
+    OUTPUT = 3
+
+    def __init__(
+            self,
+            module_inputs: Dict[str, str],
+            module_outputs: Dict[str, str],
+            flipflops: List[str],
+            conjunctions: List[str]):
+        self.names = list(dict.fromkeys([*module_outputs, *module_inputs]))
+        self.ids = {name: i for i, name in enumerate(self.names)}
+        flipflop_names = set(flipflops)
+        conjunction_names = set(conjunctions)
+        self.kinds = bytearray()
+        for name in self.names:
+            if name in flipflop_names:
+                self.kinds.append(Network.FLIPFLOP)
+            elif name in conjunction_names:
+                self.kinds.append(Network.CONJUNCTION)
+            elif name == "broadcaster":
+                self.kinds.append(Network.BROADCAST)
+            else:
+                self.kinds.append(Network.OUTPUT)
+        # bit of each sender within the memory of a conjunction
+        self.input_bits = [{} for _ in self.names]
+        self.n_inputs = [0] * len(self.names)
+        for name in conjunctions:
+            receiver = self.ids[name]
+            for k, sender in enumerate(module_inputs.get(name, [])):
+                self.input_bits[receiver][self.ids[sender]] = 1 << k
+            self.n_inputs[receiver] = len(module_inputs.get(name, []))
+        self.outputs = [
+            [self.ids[output] for output in module_outputs.get(name, [])]
+            for name in self.names
+        ]
+        self.reset()
+
+    def reset(self):
+        self.is_on = bytearray(len(self.names))
+        self.memory = [0] * len(self.names)
+        self.high_counts = [0] * len(self.names)
+
+    def id_of(self, action: Action) -> Tuple[int, int, int]:
+        return self.ids[action.sender], self.ids[action.receiver], action.pulse.value
+
+    def push_button(self, watch: frozenset = frozenset()) -> Tuple[int, int, List[Tuple[int, int, int]]]:
+        """
+        Same as push_button, but over the compiled network.
+        Returns the number of low and high pulses sent and
+        the watched (sender, receiver, pulse) triples that were
+        sent during this button press, in order.
+        """
+        kinds = self.kinds
+        outputs = self.outputs
+        input_bits = self.input_bits
+        n_inputs = self.n_inputs
+        is_on = self.is_on
+        memory = self.memory
+        high_counts = self.high_counts
+        seen = []
+        counts = [1, 0] # count the initial low pulse here
+        broadcaster = self.ids["broadcaster"]
+        queue = deque([(broadcaster, broadcaster, 0)])
+        while queue:
+            sender, receiver, pulse = queue.popleft()
+            if watch and (sender, receiver, pulse) in watch:
+                seen.append((sender, receiver, pulse))
+            kind = kinds[receiver]
+            if kind == Network.FLIPFLOP:
+                if pulse:
+                    continue
+                is_on[receiver] ^= 1
+                pulse_to_send = is_on[receiver]
+            elif kind == Network.CONJUNCTION:
+                bit = input_bits[receiver][sender]
+                if pulse and not memory[receiver] & bit:
+                    memory[receiver] |= bit
+                    high_counts[receiver] += 1
+                elif not pulse and memory[receiver] & bit:
+                    memory[receiver] &= ~bit
+                    high_counts[receiver] -= 1
+                pulse_to_send = 0 if high_counts[receiver] == n_inputs[receiver] else 1
+            elif kind == Network.BROADCAST:
+                pulse_to_send = pulse
+            else:
+                # pulse went to a test module
+                continue
+            counts[pulse_to_send] += len(outputs[receiver])
+            for output in outputs[receiver]:
+                queue.append((receiver, output, pulse_to_send))
+        return counts[0], counts[1], seen
+
+def push_button_n_times_compiled(network: Network, n: int) -> Dict[Pulse, int]:
+    """
+    Same as push_button_n_times, but over the compiled network.
+    """
+    pulse_counts = {
+        Pulse.LOW: 0,
+        Pulse.HIGH: 0,
+    }
+    for _ in range(n):
+        low, high, _ = network.push_button()
+        pulse_counts[Pulse.LOW] += low
+        pulse_counts[Pulse.HIGH] += high
+    return pulse_counts
+
+def push_button_until_target_compiled(network: Network, target: Action) -> int:
+    """
+    Same as push_button_until_target, but over the compiled network.
+    """
+    watch = frozenset([network.id_of(target)])
+    count = 1
+    while not network.push_button(watch)[2]:
+        count += 1
+    return count
+
+def find_rx_targets(module_inputs: Dict[str, str], final: str = "rx") -> List[Action]:
+    """
+    Module "rx" is fed by a single Conjunction, which only sends
+    the LOW pulse that turns "rx" on once all of its own inputs
+    have last sent it a HIGH pulse. Those inputs are themselves
+    Conjunctions that each send HIGH on a fixed cycle, so the
+    targets to watch for are HIGH pulses from each of them into
+    the feeder of "rx".
+    """
+    (feeder,) = module_inputs[final]
+    return [Action(input, feeder, Pulse.HIGH) for input in module_inputs[feeder]]
+
+def push_button_until_all_targets(network: Network, targets: List[Action]) -> List[int]:
+    """
+    Push the button until each of the target actions has been
+    detected at least once. Return the number of button presses
+    at which each target was first detected.
+    """
+    watch = frozenset(network.id_of(target) for target in targets)
+    first_seen = {}
+    count = 0
+    while len(first_seen) < len(watch):
+        count += 1
+        for triple in network.push_button(watch)[2]:
+            first_seen.setdefault(triple, count)
+    return [first_seen[network.id_of(target)] for target in targets]
+
 def push_button_until_rx_is_on(
         info_from_input: Tuple[Dict[str, str], Dict[str, str], List[str], List[str]]) -> int:
     """
-    Manually inspecting the input document shows that the
-    "kz" Conjunction module is the only one that sends a 
-    signal to module "rx". It will take many button presses
-    for this to happen, but it can be observed that Conjunctions
-    "sj", "qq", "ls", and "bg" are inputs to "kz". When
-    each of those conjunctions sends a HIGH pulse to "kz", 
-    "kz" will in turn send a LOW signal to "rx", which will
-    turn "rx" on.
-
-    To speed up this process, we search for when "sj", "qq",
-    "ls", and "bg" separately send a HIGH pulse to "kz" for
-    the first time. Taking the least common multiple then tells
-    us when these cycles converge to send HIGH pulses to "kz"
-    within the same button press.
-    """
-    targets = [Action("sj", "kz", Pulse.HIGH),
-               Action("qq", "kz", Pulse.HIGH),
-               Action("ls", "kz", Pulse.HIGH),
-               Action("bg", "kz", Pulse.HIGH),
-    ]
-    presses_until_on = []
-    for target in targets:
-        modules = build_modules(*info_from_input)
-        presses = push_button_until_target(modules, target)
-        presses_until_on.append(presses)
+    The Conjunction that sends a signal to module "rx" only turns
+    "rx" on when all of its input Conjunctions send it a HIGH
+    pulse within the same button press. It will take many button
+    presses for this to happen.
+
+    To speed up this process, we find those input Conjunctions from
+    the wiring of the network and record the first button press at
+    which each of them sends a HIGH pulse, all within a single run
+    of the network. Taking the least common multiple then tells
+    us when these cycles converge to send HIGH pulses within the
+    same button press.
+    """
+    module_inputs = info_from_input[0]
+    targets = find_rx_targets(module_inputs)
+    network = Network(*info_from_input)
+    presses_until_on = push_button_until_all_targets(network, targets)
     num_presses = compute_lcm(presses_until_on)
     return num_presses
 
@@ -232,9 +378,8 @@ def compute_lcm(values: List[int]) -> int:
 
 if __name__ == "__main__":
     info_from_input = read_input(sys.argv[1])
-    modules = build_modules(*info_from_input)
-    # counts = push_button(modules)
-    counts = push_button_n_times(modules, 1000)
+    network = Network(*info_from_input)
+    counts = push_button_n_times_compiled(network, 1000)
     print(counts[Pulse.LOW] * counts[Pulse.HIGH])
 
     num_button_presses = push_button_until_rx_is_on(info_from_input)
@@ -1,5 +1,7 @@
 import sys
 
+from collections import deque
+from dataclasses import dataclass
 from queue import Queue
 from typing import List
 
@@ -45,6 +47,170 @@ def bfs(grid, step_limit):
         steps += 1
     return reachable_plots
 
+def count_reachable_plots(grid, max_steps):
+    """
+    Run a single breadth-first search over the infinite tiling of
+    the grid, looking up plots modulo the grid size instead of
+    copying the grid. Returns a list whose entry at index steps
+    is the number of plots that can be reached in exactly that
+    many steps, so any number of step limits up to max_steps can
+    be answered from one search.
+
+    Every step changes the parity of row + col, so a plot that is
+    an even number of steps away can be reached at every even step
+    limit from then on (and likewise for odd), by stepping back and
+    forth. The neighbors of plots found at the latest step are
+    either new or were found the step before, so only the last two
+    frontiers need to be kept to recognize visited plots.
+    """
+    rows = len(grid)
+    cols = len(grid[0])
+    previous = set()
+    frontier = {find_start(grid)}
+    directions = [(1,0), (0,1), (0,-1), (-1,0)]
+    # number of plots found so far with even/odd distance
+    parity_counts = [1, 0]
+    counts = [1]
+    for steps in range(1, max_steps + 1):
+        new_frontier = set()
+        for row, col in frontier:
+            for drow, dcol in directions:
+                coords = (row + drow, col + dcol)
+                if coords in previous or coords in new_frontier:
+                    continue
+                if grid[coords[0] % rows][coords[1] % cols] != "#":
+                    new_frontier.add(coords)
+        previous, frontier = frontier, new_frontier
+        parity_counts[steps % 2] += len(frontier)
+        counts.append(parity_counts[steps % 2])
+    return counts
+
+@dataclass
+class DistanceMap:
+    """
+    Shortest distances from one entry point to every plot of a
+    single tile. counts[parity][steps] is the number of plots
+    whose distance has that parity and is at most steps, for
+    steps up to the largest distance in the tile.
+    """
+    counts: List[List[int]]
+
+    @property
+    def max_distance(self):
+        return len(self.counts[0]) - 1
+
+    def count_reachable(self, steps):
+        """
+        Plots that can be reached in exactly steps steps after
+        entering the tile at the entry point.
+        """
+        if steps < 0:
+            return 0
+        return self.counts[steps % 2][min(steps, self.max_distance)]
+
+def compute_distance_map(grid, start):
+    """
+    Breadth-first search within a single tile.
+    """
+    size = len(grid)
+    distances = {start: 0}
+    queue = deque([start])
+    directions = [(1,0), (0,1), (0,-1), (-1,0)]
+    while queue:
+        row, col = queue.popleft()
+        for drow, dcol in directions:
+            coords = (row + drow, col + dcol)
+            if 0 <= coords[0] < size and 0 <= coords[1] < size:
+                if not coords in distances and grid[coords[0]][coords[1]] != "#":
+                    distances[coords] = distances[(row, col)] + 1
+                    queue.append(coords)
+    max_distance = max(distances.values())
+    counts = [[0] * (max_distance + 1) for _ in range(2)]
+    for distance in distances.values():
+        counts[distance % 2][distance] += 1
+    for parity in range(2):
+        for steps in range(1, max_distance + 1):
+            counts[parity][steps] += counts[parity][steps - 1]
+    return DistanceMap(counts)
+
+def build_entry_distance_maps(grid):
+    """
+    Every tile other than the starting one is entered through
+    one of its corners or edge midpoints. This relies on the
+    same structure of the input as the quadratic fit: the start
+    is in the middle of a square grid of odd size and the row
+    and column of the start as well as the border of the grid
+    are free of rocks, so the quickest way into a tile is along
+    those lanes.
+
+    Returns distance maps from the start, from each edge
+    midpoint (for tiles straight up, down, left or right of the
+    starting one) and from each corner (for tiles in the four
+    quadrants between them).
+    """
+    size = len(grid)
+    middle = size // 2
+    edges = [(middle, 0), (middle, size-1), (0, middle), (size-1, middle)]
+    corners = [(0, 0), (0, size-1), (size-1, 0), (size-1, size-1)]
+    return (
+        compute_distance_map(grid, find_start(grid)),
+        [compute_distance_map(grid, entry) for entry in edges],
+        [compute_distance_map(grid, entry) for entry in corners],
+    )
+
+def count_plots_in_tile_series(distance_map, steps, size, diagonal):
+    """
+    Count plots that can be reached in a series of tiles that
+    are entered through the same kind of entry point, where the
+    k-th tile of the series is entered with steps - k*size steps
+    left. Along an axis there is one tile per k; in a quadrant
+    there are k + 1 tiles per k.
+
+    Tiles entered with at least max_distance steps left are full,
+    so only their parity matters and they are counted with sums
+    of the tile weights by parity of k. The few tiles near the edge
+    of the reachable area are counted one by one.
+    """
+    if steps < 0:
+        return 0
+    n_full = 0
+    if steps >= distance_map.max_distance:
+        n_full = (steps - distance_map.max_distance) // size + 1
+    # sums of tile weights for full tiles with even and odd k
+    n_even = (n_full + 1) // 2
+    n_odd = n_full // 2
+    if diagonal:
+        weights = [n_even**2, n_odd * (n_odd + 1)]
+    else:
+        weights = [n_even, n_odd]
+    count = 0
+    for parity in range(2):
+        count += weights[parity] * distance_map.count_reachable(steps - parity * size)
+    k = n_full
+    while steps - k*size >= 0:
+        weight = k + 1 if diagonal else 1
+        count += weight * distance_map.count_reachable(steps - k*size)
+        k += 1
+    return count
+
+def count_reachable_plots_in_tiling(distance_maps, size, steps):
+    """
+    Count plots that can be reached in exactly steps steps on the
+    infinite tiling, for any step count, from the distance maps of
+    build_entry_distance_maps. Tiles straight off to a side are
+    entered middle + 1 steps after leaving the starting tile's
+    center and tiles in a quadrant are entered 2*(middle + 1) steps
+    after. Each further tile adds size steps.
+    """
+    start_map, edge_maps, corner_maps = distance_maps
+    middle = size // 2
+    count = start_map.count_reachable(steps)
+    for edge_map in edge_maps:
+        count += count_plots_in_tile_series(edge_map, steps - (middle + 1), size, False)
+    for corner_map in corner_maps:
+        count += count_plots_in_tile_series(corner_map, steps - 2*(middle + 1), size, True)
+    return count
+
 def find_start(grid):
     for row in range(len(grid)):
         for col in range(len(grid[0])):
@@ -69,7 +235,7 @@ def lagrange_interpolation(y0, y1, y2, x):
     ref: https://en.wikipedia.org/wiki/Polynomial_interpolation#Lagrange_Interpolation
     """
     # first order coefficient
-    a1 = -y0 + 2*y1 - y2/2
+    a1 = -3*y0/2 + 2*y1 - y2/2
     # second order coefficient
     a2 = y0/2 - y1 + y2/2
     estimate = y0 + a1*x + a2 * x**2
@@ -99,11 +265,15 @@ if __name__ == "__main__":
     n = 2, y = 93252
     """
     target = 26501365
-    # have to make the grid big enough to support
-    # traveling out farther than one grid size.
-    super_grid = make_super_grid(grid, 9)
-    y0 = len(bfs(super_grid, target%size))
-    y1 = len(bfs(super_grid, target%size+size))
-    y2 = len(bfs(super_grid, target%size+2*size))
+    # a single search over the infinite tiling provides all
+    # three samples for the fit
+    counts = count_reachable_plots(grid, target%size+2*size)
+    y0 = counts[target%size]
+    y1 = counts[target%size+size]
+    y2 = counts[target%size+2*size]
     print(y0, y1, y2)
-    print(lagrange_interpolation(y0, y1, y2, 26501365//131))
+    print(lagrange_interpolation(y0, y1, y2, target//size))
+
+    # same answer without relying on the target being 65 + n*size
+    distance_maps = build_entry_distance_maps(grid)
+    print(count_reachable_plots_in_tiling(distance_maps, size, target))
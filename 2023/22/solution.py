@@ -123,6 +123,48 @@ def drop_bricks(bricks):
             levels.sort(reverse=True)
         level_to_bricks[brick.zmax].append(brick)
 
+def drop_bricks_height_map(bricks):
+    """
+    Drop bricks into the correct locations, producing the same
+    support graph as drop_bricks without comparing each brick
+    against the bricks already at rest.
+
+    Bricks are dropped lowest first as in drop_bricks. Over the
+    xy plane, keep a height map of the top of the stack and a map
+    of which brick is on top at each cell. A falling brick comes
+    to rest one above the highest cell under its footprint, and
+    it is supported by the bricks on top at the cells of its
+    footprint that have that height (the ground is labeled None).
+    The brick then becomes the top of the stack at its footprint.
+    """
+    if not bricks:
+        return
+    bricks.sort(key = lambda x: x.zmin)
+    labeled_bricks = {brick.label: brick for brick in bricks}
+    xmin = min(brick.xmin for brick in bricks)
+    ymin = min(brick.ymin for brick in bricks)
+    n_x = max(brick.xmax for brick in bricks) - xmin + 1
+    n_y = max(brick.ymax for brick in bricks) - ymin + 1
+    heights = [[0] * n_y for _ in range(n_x)]
+    top_bricks = [[None] * n_y for _ in range(n_x)]
+    for brick in bricks:
+        footprint = [
+            (x - xmin, y - ymin)
+            for x in range(brick.xmin, brick.xmax + 1)
+            for y in range(brick.ymin, brick.ymax + 1)
+        ]
+        level = max(heights[x][y] for x, y in footprint)
+        for x, y in footprint:
+            if heights[x][y] == level and top_bricks[x][y] not in brick.supported_by:
+                label = top_bricks[x][y]
+                brick.supported_by.add(label)
+                if label is not None:
+                    labeled_bricks[label].supported_bricks.add(brick.label)
+        brick.update_z(level + 1)
+        for x, y in footprint:
+            heights[x][y] = brick.zmax
+            top_bricks[x][y] = brick.label
+
 def find_bricks_to_disintegrate(labeled_bricks):
     """
     for each brick, check the bricks it supports. if any of the
@@ -175,14 +217,75 @@ def sum_chain_reactions(labeled_bricks, structural_brick_labels):
         total += count_chain_reaction(label, labeled_bricks)
     return total
 
+def count_chain_reactions(labeled_bricks):
+    """
+    Count the bricks that fall when each brick is disintegrated,
+    for all bricks at once, using the dominator tree of the support
+    graph rooted at the ground.
+
+    A brick dominates another if every chain of support from the
+    ground to the other brick goes through it. Disintegrating a
+    brick therefore makes exactly the bricks it dominates fall.
+    The immediate dominator of a brick is the nearest common
+    dominator of all the bricks that support it, so processing
+    bricks from the bottom up lets each brick be attached to the
+    lowest common ancestor of its supporters in the tree built
+    so far. Ancestors are found by binary lifting. The number of
+    bricks that fall is then the size of the subtree under the
+    brick, minus the brick itself.
+    """
+    # bricks only rest on bricks with lower zmin
+    order = sorted(labeled_bricks, key = lambda label: labeled_bricks[label].zmin)
+    # node 0 is the ground
+    nodes = {None: 0}
+    for label in order:
+        nodes[label] = len(nodes)
+    n_levels = max(1, len(nodes).bit_length())
+    # ancestors[k][node] is the 2**k-th dominator above node
+    ancestors = [[0] * len(nodes) for _ in range(n_levels)]
+    depths = [0] * len(nodes)
+
+    def lowest_common_ancestor(a, b):
+        if depths[a] < depths[b]:
+            a, b = b, a
+        difference = depths[a] - depths[b]
+        for k in range(n_levels):
+            if difference >> k & 1:
+                a = ancestors[k][a]
+        if a == b:
+            return a
+        for k in reversed(range(n_levels)):
+            if ancestors[k][a] != ancestors[k][b]:
+                a = ancestors[k][a]
+                b = ancestors[k][b]
+        return ancestors[0][a]
+
+    for label in order:
+        node = nodes[label]
+        supporters = [nodes[support] for support in labeled_bricks[label].supported_by]
+        dominator = supporters[0]
+        for supporter in supporters[1:]:
+            dominator = lowest_common_ancestor(dominator, supporter)
+        depths[node] = depths[dominator] + 1
+        ancestors[0][node] = dominator
+        for k in range(1, n_levels):
+            ancestors[k][node] = ancestors[k-1][ancestors[k-1][node]]
+
+    subtree_sizes = [1] * len(nodes)
+    for label in reversed(order):
+        node = nodes[label]
+        subtree_sizes[ancestors[0][node]] += subtree_sizes[node]
+    return {label: subtree_sizes[nodes[label]] - 1 for label in order}
+
 if __name__ == "__main__":
     bricks = read_input(sys.argv[1])
-    drop_bricks(bricks)
+    drop_bricks_height_map(bricks)
     labeled_bricks = {brick.label: brick for brick in bricks}
     can_disintegrate = find_bricks_to_disintegrate(labeled_bricks)
     print(len(can_disintegrate))
 
     labels = set(labeled_bricks.keys())
     structural_brick_labels = labels.difference(can_disintegrate)
-    sum_fallen = sum_chain_reactions(labeled_bricks, structural_brick_labels)
+    chain_reactions = count_chain_reactions(labeled_bricks)
+    sum_fallen = sum(chain_reactions[label] for label in structural_brick_labels)
     print(sum_fallen)
\ No newline at end of file
@@ -1,10 +1,13 @@
 import sys
 
+from concurrent.futures import ProcessPoolExecutor
 from dataclasses import dataclass
+from multiprocessing import Value
 from queue import Queue
-from typing import Dict, List, Set, Tuple
+from typing import Dict, List, Optional, Set, Tuple
 
-sys.setrecursionlimit(10000)
+# recursion depth needed by find_longest_path, one frame per tile
+RECURSION_LIMIT = 10000
 
 SLOPES = {
     "^": (-1, 0),
@@ -65,6 +68,8 @@ def find_longest_path(
     If the current location is on a slope, only one direction
     is available for movement.
     """
+    if sys.getrecursionlimit() < RECURSION_LIMIT:
+        sys.setrecursionlimit(RECURSION_LIMIT)
     if coord == target:
         return len(path)-1 # don't count the initial tile
     longest = 0
@@ -146,6 +151,97 @@ def connect_vertices(
             length += 1
     return graph
 
+def connect_vertices_downhill(
+        grid: List[List[str]],
+        vertices: Dict[Tuple[int,int], Vertex]
+    ) -> Dict[Vertex, List[Edge]]:
+    """
+    Same as connect_vertices, but respecting the slopes: a slope
+    can only be entered and left in the direction it points. The
+    resulting graph is directed.
+    """
+    n_rows = len(grid)
+    n_cols = len(grid[0])
+    graph = {vertex: [] for vertex in vertices.values()}
+    for start in vertices.values():
+        queue = Queue()
+        queue.put(start.coord)
+        visited = set()
+        visited.add(start.coord)
+        length = 0
+        while not queue.empty():
+            for _ in range(queue.qsize()):
+                coord = queue.get()
+                if coord in vertices and length > 0:
+                    graph[start].append(Edge(start, vertices[coord], length))
+                    continue
+                tile = grid[coord[0]][coord[1]]
+                if tile in SLOPES:
+                    directions = [SLOPES[tile]]
+                else:
+                    directions = list(SLOPES.values())
+                for drow, dcol in directions:
+                    new_row = coord[0] + drow
+                    new_col = coord[1] + dcol
+                    if 0 <= new_row < n_rows and 0 <= new_col < n_cols:
+                        new_tile = grid[new_row][new_col]
+                        if new_tile == "#" or new_tile in SLOPES and SLOPES[new_tile] != (drow, dcol):
+                            continue
+                        new_coord = (new_row, new_col)
+                        if new_coord not in visited:
+                            visited.add(new_coord)
+                            queue.put(new_coord)
+            length += 1
+    return graph
+
+def find_longest_path_downhill(
+        graph: Dict[Vertex, List[Edge]],
+        start: Vertex,
+        target: Vertex
+    ) -> int:
+    """
+    With slopes respected, the junction graph has no cycles, so the
+    longest path can be found in linear time by visiting vertices in
+    topological order (Kahn's algorithm) and extending the longest
+    path to each vertex along its outgoing edges.
+
+    There are no slopes next to the start and the target, so edges
+    back into the start and out of the target are dropped; a path
+    can never use them anyway.
+
+    Unlike find_longest_path, this does not recurse, so part 1 no
+    longer needs a raised recursion limit.
+    """
+    graph = {
+        vertex: [edge for edge in edges if edge.end != start] if vertex != target else []
+        for vertex, edges in graph.items()
+    }
+    in_degrees = {vertex: 0 for vertex in graph}
+    for edges in graph.values():
+        for edge in edges:
+            in_degrees[edge.end] += 1
+    longest = {vertex: None for vertex in graph}
+    longest[start] = 0
+    queue = Queue()
+    for vertex, in_degree in in_degrees.items():
+        if in_degree == 0:
+            queue.put(vertex)
+    n_sorted = 0
+    while not queue.empty():
+        vertex = queue.get()
+        n_sorted += 1
+        for edge in graph[vertex]:
+            if longest[vertex] is not None:
+                length = longest[vertex] + edge.length
+                if longest[edge.end] is None or length > longest[edge.end]:
+                    longest[edge.end] = length
+            in_degrees[edge.end] -= 1
+            if in_degrees[edge.end] == 0:
+                queue.put(edge.end)
+    if n_sorted < len(graph):
+        raise ValueError("junction graph has a cycle, so slopes do not make it a DAG")
+    return longest[target]
+
 def find_longest_path_through_vertices(
         graph: Dict[Vertex, List[Edge]],
         vertex: Vertex,
@@ -171,22 +267,229 @@ def find_longest_path_through_vertices(
     visited.remove(vertex)
     return longest
 
+def compile_graph(
+        graph: Dict[Vertex, List[Edge]]
+    ) -> Tuple[Dict[Vertex, int], List[List[int]], List[List[int]]]:
+    """
+    Renumber the vertices 0..N-1 and store the graph as lists of
+    neighbor ids and edge lengths per vertex.
+    """
+    ids = {}
+    for vertex, edges in graph.items():
+        ids.setdefault(vertex, len(ids))
+        for edge in edges:
+            ids.setdefault(edge.end, len(ids))
+    neighbors = [[] for _ in ids]
+    lengths = [[] for _ in ids]
+    for vertex, edges in graph.items():
+        for edge in edges:
+            neighbors[ids[vertex]].append(ids[edge.end])
+            lengths[ids[vertex]].append(edge.length)
+    return ids, neighbors, lengths
+
+@dataclass
+class PathSearch:
+    """
+    Junction graph prepared for the longest path search. Vertices
+    are numbered 0..N-1 and adjacency holds (bit, id, edge length)
+    of the neighbors of each vertex, longest edges first so that
+    long paths are found early and prune more of the search.
+    """
+    adjacency: List[List[Tuple[int, int, int]]]
+    longest_edges: List[int]
+    start: int
+    goal: int
+    final_length: int
+
+    @property
+    def initial_state(self) -> Tuple[int, int, int, int]:
+        """(vertex, visited bits, length so far, remaining bound) at the start."""
+        return (
+            self.start,
+            1 << self.start,
+            0,
+            sum(self.longest_edges) - self.longest_edges[self.start],
+        )
+
+def prepare_path_search(
+        graph: Dict[Vertex, List[Edge]],
+        start: Vertex,
+        target: Vertex
+    ) -> PathSearch:
+    """
+    If the target can only be reached through a single exit vertex,
+    a path that visits the exit has to go straight on to the target,
+    so the search stops at the exit and adds the last edge.
+    """
+    ids, neighbors, lengths = compile_graph(graph)
+    goal = ids[target]
+    final_length = 0
+    if len(neighbors[goal]) == 1:
+        final_length = lengths[goal][0]
+        goal = neighbors[goal][0]
+    # longest edge into each vertex
+    longest_edges = [max(edge_lengths, default=0) for edge_lengths in lengths]
+    adjacency = [
+        sorted(
+            [(1 << neighbor, neighbor, length) for neighbor, length in zip(vertex_neighbors, vertex_lengths)],
+            key = lambda x: -x[2]
+        )
+        for vertex_neighbors, vertex_lengths in zip(neighbors, lengths)
+    ]
+    return PathSearch(adjacency, longest_edges, ids[start], goal, final_length)
+
+def search_longest_path(
+        search: PathSearch,
+        state: Tuple[int, int, int, int],
+        shared_longest = None
+    ) -> int:
+    """
+    Depth first search from the given state for the longest path
+    to the goal, with the visited vertices kept as bits of an
+    integer. Returns -1 if the goal cannot be reached.
+
+    Every edge still to be taken ends at a vertex that has not been
+    visited yet, so the remaining length of a path is at most the sum
+    of the longest edge into each unvisited vertex. Branches that
+    cannot beat the longest path found so far with that much length
+    left are pruned.
+
+    A shared value (multiprocessing.Value) can be given to share the
+    longest path found so far with searches in other processes. It is
+    updated on every improvement and read back periodically.
+    """
+    adjacency = search.adjacency
+    longest_edges = search.longest_edges
+    goal = search.goal
+    longest = -1 if shared_longest is None else shared_longest.value
+    n_calls = 0
+
+    def dfs(vertex, visited, length, remaining):
+        nonlocal longest, n_calls
+        if vertex == goal:
+            if length > longest:
+                longest = length
+                if shared_longest is not None:
+                    with shared_longest.get_lock():
+                        shared_longest.value = max(shared_longest.value, length)
+            return
+        if shared_longest is not None:
+            n_calls += 1
+            if n_calls % 4096 == 0:
+                longest = max(longest, shared_longest.value)
+        if length + remaining <= longest:
+            return
+        for bit, neighbor, edge_length in adjacency[vertex]:
+            if not visited & bit:
+                dfs(
+                    neighbor,
+                    visited | bit,
+                    length + edge_length,
+                    remaining - longest_edges[neighbor],
+                )
+
+    dfs(*state)
+    return longest
+
+def find_longest_path_bitmask(
+        graph: Dict[Vertex, List[Edge]],
+        start: Vertex,
+        target: Vertex
+    ) -> int:
+    """
+    Same search as find_longest_path_through_vertices, but over
+    integer vertex ids with a visited bitmask and pruning.
+    """
+    search = prepare_path_search(graph, start, target)
+    longest = search_longest_path(search, search.initial_state)
+    if longest < 0:
+        return 0
+    return longest + search.final_length
+
+def enumerate_path_prefixes(
+        search: PathSearch,
+        depth: int
+    ) -> Tuple[List[Tuple[int, int, int, int]], int]:
+    """
+    Enumerate the distinct paths of up to depth edges from the start
+    as search states. Returns the states at that depth along with
+    the longest of the paths that already reached the goal sooner.
+    """
+    prefixes = []
+    longest = -1
+    stack = [(search.initial_state, 0)]
+    while stack:
+        state, n_edges = stack.pop()
+        vertex, visited, length, remaining = state
+        if vertex == search.goal:
+            longest = max(longest, length)
+        elif n_edges == depth:
+            prefixes.append(state)
+        else:
+            for bit, neighbor, edge_length in search.adjacency[vertex]:
+                if not visited & bit:
+                    new_state = (
+                        neighbor,
+                        visited | bit,
+                        length + edge_length,
+                        remaining - search.longest_edges[neighbor],
+                    )
+                    stack.append((new_state, n_edges + 1))
+    return prefixes, longest
+
+# search inputs and longest path so far, shared by all prefix
+# searches in a worker process
+WORKER_SEARCH = None
+WORKER_LONGEST = None
+
+def init_worker(search: PathSearch, shared_longest):
+    global WORKER_SEARCH, WORKER_LONGEST
+    WORKER_SEARCH = search
+    WORKER_LONGEST = shared_longest
+
+def search_prefix(state: Tuple[int, int, int, int]) -> int:
+    return search_longest_path(WORKER_SEARCH, state, WORKER_LONGEST)
+
+def find_longest_path_parallel(
+        graph: Dict[Vertex, List[Edge]],
+        start: Vertex,
+        target: Vertex,
+        depth: int = 6,
+        max_workers: Optional[int] = None
+    ) -> int:
+    """
+    Split the longest path search over worker processes. All
+    distinct paths of depth edges from the start are searched
+    independently, and the workers share the longest path found
+    so far so that each one prunes with the best bound known.
+    The search inputs and the shared bound are handed to each
+    worker once when it starts.
+    """
+    search = prepare_path_search(graph, start, target)
+    prefixes, longest = enumerate_path_prefixes(search, depth)
+    shared_longest = Value("i", longest)
+    with ProcessPoolExecutor(
+            max_workers=max_workers,
+            initializer=init_worker,
+            initargs=(search, shared_longest)
+        ) as executor:
+        for length in executor.map(search_prefix, prefixes):
+            longest = max(longest, length)
+    if longest < 0:
+        return 0
+    return longest + search.final_length
+
 if __name__ == "__main__":
     grid = read_input(sys.argv[1])
     start = find_path_in_row(grid, row=0)
     target = find_path_in_row(grid, row=len(grid)-1)
-    longest = find_longest_path(grid, target, start, set(), [start])
-    print(longest)
-
     vertices = find_vertices(grid)
     vertices[start] = Vertex(*start)
     vertices[target] = Vertex(*target)
+    downhill_graph = connect_vertices_downhill(grid, vertices)
+    longest = find_longest_path_downhill(downhill_graph, vertices[start], vertices[target])
+    print(longest)
+
     graph = connect_vertices(grid, vertices)
-    longest = find_longest_path_through_vertices(
-        graph,
-        vertices[start],
-        vertices[target],
-        set(),
-        0
-    )
+    longest = find_longest_path_parallel(graph, vertices[start], vertices[target])
     print(longest)
\ No newline at end of file
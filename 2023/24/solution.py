@@ -1,7 +1,9 @@
 import sys
 
+import numpy as np
+
 from dataclasses import dataclass
-from scipy import optimize
+from fractions import Fraction
 from typing import List, Tuple
 
 @dataclass
@@ -63,6 +65,56 @@ def count_intersections(stones, bounds):
                 intersections += 1
     return intersections
 
+def count_intersections_vectorized(stones, bounds, tile_size=2048):
+    """
+    Same count as count_intersections, but solving the 2x2 system
+    of has_intersection for many pairs of stones at once with NumPy.
+
+    For the ith and jth stones:
+    ti*vxi - tj*vxj = xj - xi
+    ti*vyi - tj*vyj = yj - yi
+    By Cramer's rule, with det = vxj*vyi - vxi*vyj:
+    ti = (vxj*(yj - yi) - vyj*(xj - xi)) / det
+    tj = (vxi*(yj - yi) - vyi*(xj - xi)) / det
+    Parallel paths (det == 0) are masked out instead of raising.
+    The numerators and determinants are exact in int64 for
+    coordinates and velocities of the size in the puzzle input.
+
+    Pairs are processed in tiles of tile_size by tile_size stones,
+    so memory stays bounded no matter how many stones there are.
+    """
+    positions = np.array([stone.position[:2] for stone in stones], dtype=np.int64)
+    velocities = np.array([stone.velocity[:2] for stone in stones], dtype=np.int64)
+    n_stones = len(stones)
+    intersections = 0
+    for start_i in range(0, n_stones, tile_size):
+        xi, yi = positions[start_i:start_i+tile_size, :, None].transpose(1, 0, 2)
+        vxi, vyi = velocities[start_i:start_i+tile_size, :, None].transpose(1, 0, 2)
+        for start_j in range(start_i, n_stones, tile_size):
+            xj, yj = positions[None, start_j:start_j+tile_size].transpose(2, 0, 1)
+            vxj, vyj = velocities[None, start_j:start_j+tile_size].transpose(2, 0, 1)
+            dx = xj - xi
+            dy = yj - yi
+            det = vxj*vyi - vxi*vyj
+            is_crossing = det != 0
+            # avoid dividing by zero for parallel paths
+            det = np.where(is_crossing, det, 1)
+            ti = (vxj*dy - vyj*dx) / det
+            tj = (vxi*dy - vyi*dx) / det
+            x = xi + ti*vxi
+            y = yi + ti*vyi
+            has_intersection = (
+                is_crossing
+                & (ti >= 0) & (tj >= 0)
+                & (bounds[0] <= x) & (x <= bounds[1])
+                & (bounds[0] <= y) & (y <= bounds[1])
+            )
+            if start_i == start_j:
+                # only count each pair once
+                has_intersection = np.triu(has_intersection, k=1)
+            intersections += int(has_intersection.sum())
+    return intersections
+
 def find_intersecting_line(stones):
     """
     We want to find a line with starting position
@@ -124,6 +176,9 @@ def find_intersecting_line(stones):
     try a few different rocks (and maybe a different
     initial guess).
     """
+    # scipy is only needed here, so only pay for importing it here
+    from scipy import optimize
+
     def equations(parameters):
         x, y, z, vx, vy, vz = parameters
         equations = []
@@ -142,13 +197,75 @@ def find_intersecting_line(stones):
     )
     return thrown_rock
 
+def solve_linear_system(matrix, rhs):
+    """
+    Solve matrix @ solution = rhs exactly by Gaussian elimination
+    on fractions. Raises ValueError if the matrix is singular.
+    """
+    n = len(matrix)
+    rows = [[Fraction(a) for a in row] + [Fraction(b)] for row, b in zip(matrix, rhs)]
+    for col in range(n):
+        pivot = next((row for row in range(col, n) if rows[row][col] != 0), None)
+        if pivot is None:
+            raise ValueError("singular system of equations")
+        rows[col], rows[pivot] = rows[pivot], rows[col]
+        for row in range(n):
+            if row != col and rows[row][col] != 0:
+                factor = rows[row][col] / rows[col][col]
+                rows[row] = [a - factor*b for a, b in zip(rows[row], rows[col])]
+    return [rows[i][n] / rows[i][i] for i in range(n)]
+
+def find_intersecting_line_exact(stones):
+    """
+    Same rock as find_intersecting_line, but solved exactly.
+
+    Expanding the equation for the ith stone,
+    (x - xi)*(vy - vyi) = (y - yi)*(vx - vxi)
+    gives the nonlinear term x*vy - y*vx, which is the same for
+    every stone. Subtracting the equations of stones i and j
+    eliminates it and leaves a linear equation:
+    (vyj - vyi)*x + (vxi - vxj)*y + (yi - yj)*vx + (xj - xi)*vy
+        = xj*vyj - xi*vyi + yi*vxi - yj*vxj
+    and likewise with z in place of y. Three pairs of stones for
+    each of (x, y) and (x, z) give six linear equations for the six
+    unknowns, which are solved with fractions so that the result is
+    exact. If the chosen stones give a singular system (e.g. some of
+    them are parallel), the next stones are tried.
+    """
+    for first in range(len(stones) - 3):
+        matrix = []
+        rhs = []
+        for second in range(first + 1, first + 4):
+            xi, yi, zi = stones[first].position
+            vxi, vyi, vzi = stones[first].velocity
+            xj, yj, zj = stones[second].position
+            vxj, vyj, vzj = stones[second].velocity
+            # unknowns are (x, y, z, vx, vy, vz)
+            matrix.append([vyj - vyi, vxi - vxj, 0, yi - yj, xj - xi, 0])
+            rhs.append(xj*vyj - xi*vyi + yi*vxi - yj*vxj)
+            matrix.append([vzj - vzi, 0, vxi - vxj, zi - zj, 0, xj - xi])
+            rhs.append(xj*vzj - xi*vzi + zi*vxi - zj*vxj)
+        try:
+            solution = solve_linear_system(matrix, rhs)
+        except ValueError:
+            continue
+        # the rock's position and velocity are integers if the input
+        # has a solution at all
+        solution = [int(value) if value.denominator == 1 else value for value in solution]
+        return Stone(tuple(solution[:3]), tuple(solution[3:]))
+    raise ValueError("no stones give a solvable system of equations")
+
 if __name__ == "__main__":
     stones = read_input(sys.argv[1])
     # bounds = (7, 27)
     bounds = (200000000000000, 400000000000000)
-    intersections = count_intersections(stones, bounds)
+    intersections = count_intersections_vectorized(stones, bounds)
     print(intersections)
 
-    rock = find_intersecting_line(stones)
+    try:
+        rock = find_intersecting_line_exact(stones)
+    except ValueError:
+        # fall back to the nonlinear solver
+        rock = find_intersecting_line(stones)
     print(rock)
     print(round(sum(rock.position)))
@@ -1,5 +1,7 @@
 import sys
 
+from array import array
+from collections import deque
 from dataclasses import dataclass
 
 def read_input(input):
@@ -36,62 +38,122 @@ class Edge:
     def __hash__(self):
         return hash((self.vertex1, self.vertex2))
 
-class DisjointSets:
-    """Implements Union Find for disjoint sets."""
-    def __init__(self, vertices):
-        self.n_disjoint = len(vertices)
-        self.roots = {vertex: vertex for vertex in vertices}
-        self.ranks = {vertex: 1 for vertex in vertices}
-    
+class IntDisjointSets:
+    """
+    Implements Union Find for disjoint sets of vertices numbered
+    0..N-1, with parents and set sizes stored in int arrays.
+    """
+    def __init__(self, n_vertices):
+        self.n_disjoint = n_vertices
+        self.parents = array("i", range(n_vertices))
+        self.sizes = array("i", [1]) * n_vertices
+
     def find(self, vertex):
         """
-        Recursively find the root of a vertex.
+        Iteratively find the root of a vertex, pointing every
+        other vertex on the way at its grandparent (path halving).
+        """
+        parents = self.parents
+        while parents[vertex] != vertex:
+            parents[vertex] = parents[parents[vertex]]
+            vertex = parents[vertex]
+        return vertex
+
+    def union(self, vertex1, vertex2):
+        """Connect two vertices, attaching the smaller set to the larger"""
+        root1 = self.find(vertex1)
+        root2 = self.find(vertex2)
+        if root1 != root2:
+            if self.sizes[root1] < self.sizes[root2]:
+                root1, root2 = root2, root1
+            self.parents[root2] = root1
+            self.sizes[root1] += self.sizes[root2]
+            self.n_disjoint -= 1
+
+    def union_many(self, edges):
+        """
+        Connect the vertices of many edges, given as a flat array
+        of vertex pairs (vertex1, vertex2, vertex1, vertex2, ...).
         """
-        if vertex == self.roots[vertex]:
-            return vertex
-        self.roots[vertex] = self.find(self.roots[vertex])
-        return self.roots[vertex]
+        find = self.find
+        parents = self.parents
+        sizes = self.sizes
+        for k in range(0, len(edges), 2):
+            root1 = find(edges[k])
+            root2 = find(edges[k+1])
+            if root1 != root2:
+                if sizes[root1] < sizes[root2]:
+                    root1, root2 = root2, root1
+                parents[root2] = root1
+                sizes[root1] += sizes[root2]
+                self.n_disjoint -= 1
+
+    def get_set_sizes(self):
+        """Count number of vertices connected to each root"""
+        return {
+            vertex: self.sizes[vertex]
+            for vertex in range(len(self.parents))
+            if self.parents[vertex] == vertex
+        }
+
+def number_vertices(vertices):
+    """Number the vertices 0..N-1, returning a vertex to id mapping"""
+    return {vertex: i for i, vertex in enumerate(vertices)}
+
+def edges_to_id_pairs(ids, edges):
+    """
+    Flatten edges into an array of vertex id pairs
+    (vertex1, vertex2, vertex1, vertex2, ...) for union_many.
+    """
+    pairs = array("i")
+    for edge in edges:
+        pairs.append(ids[edge.vertex1])
+        pairs.append(ids[edge.vertex2])
+    return pairs
+
+class DisjointSets:
+    """
+    Implements Union Find for disjoint sets of Vertex objects
+    on top of IntDisjointSets.
+    """
+    def __init__(self, vertices):
+        self.vertices = list(vertices)
+        self.ids = number_vertices(self.vertices)
+        self.sets = IntDisjointSets(len(self.vertices))
+
+    @property
+    def n_disjoint(self):
+        return self.sets.n_disjoint
+
+    def find(self, vertex):
+        """Find the root of a vertex."""
+        return self.vertices[self.sets.find(self.ids[vertex])]
 
     def not_connected(self, edge):
         """
         Check that two vertices given by an edge are not
         already connected.
         """
-        root1 = self.find(edge.vertex1)
-        root2 = self.find(edge.vertex2)
+        root1 = self.sets.find(self.ids[edge.vertex1])
+        root2 = self.sets.find(self.ids[edge.vertex2])
         return root1 != root2
 
     def union(self, edge):
         """Connect two vertices given by an edge"""
-        root1 = self.find(edge.vertex1)
-        root2 = self.find(edge.vertex2)
-        if root1 != root2:
-            if self.ranks[root1] > self.ranks[root2]:
-                self.roots[root2] = root1
-            elif self.ranks[root1] < self.ranks[root2]:
-                self.roots[root1] = root2
-            else:
-                self.roots[root1] = root2
-                self.ranks[root2] += 1
-            self.n_disjoint -= 1
-    
+        self.sets.union(self.ids[edge.vertex1], self.ids[edge.vertex2])
+
+    def edges_to_array(self, edges):
+        """Flatten edges into an array of vertex id pairs for union_many"""
+        return edges_to_id_pairs(self.ids, edges)
+
     def get_set_sizes(self):
         """Count number of vertices connected to each root"""
-        for root in self.roots:
-            self.find(root)
-        counts = {}
-        for root in self.roots.values():
-            if root not in counts:
-                counts[root] = 1
-            else:
-                counts[root] += 1
-        return counts
+        return {self.vertices[root]: size for root, size in self.sets.get_set_sizes().items()}
 
     @classmethod
     def from_vertices_and_edges(cls, vertices, edges):
         disjoint_sets = DisjointSets(vertices)
-        for edge in edges:
-            disjoint_sets.union(edge)
+        disjoint_sets.sets.union_many(disjoint_sets.edges_to_array(edges))
         return disjoint_sets
 
 def minimum_spanning_tree(vertices, edges):
@@ -118,45 +180,128 @@ def find_smallest_set_of_interchangeable_edges(vertices, edges, mst):
     such that the removal of all three of them will partition
     the graph into two disjoint sets.
     """
-    # 
-    extra_edges = edges.difference(mst)
+    # work on vertex ids so that the disjoint sets for each
+    # removed edge can be built with a single union_many call
+    ids = number_vertices(vertices)
+    mst_edges = list(mst)
+    extra_edges = list(edges.difference(mst))
+    mst_pairs = edges_to_id_pairs(ids, mst_edges)
+    extra_pairs = edges_to_id_pairs(ids, extra_edges)
     size = sys.maxsize
     minimum_set = set()
-    for removed_edge in mst:
+    for k, removed_edge in enumerate(mst_edges):
         interchangeable_edges = {removed_edge}
-        mst.remove(removed_edge)
         # build the graph missing one of the edges
         # from the MST
-        disjoint_sets = DisjointSets.from_vertices_and_edges(
-            vertices,
-            mst
-        )
+        disjoint_sets = IntDisjointSets(len(ids))
+        disjoint_sets.union_many(mst_pairs[:2*k] + mst_pairs[2*k+2:])
         # which of the extra edges can replace the
         # removed edge in the MST?
-        for replacement_edge in extra_edges:
-            if disjoint_sets.not_connected(replacement_edge):
+        for j, replacement_edge in enumerate(extra_edges):
+            if disjoint_sets.find(extra_pairs[2*j]) != disjoint_sets.find(extra_pairs[2*j+1]):
                 interchangeable_edges.add(replacement_edge)
-        mst.add(removed_edge)
         if len(interchangeable_edges) < size:
             size = len(interchangeable_edges)
             minimum_set = interchangeable_edges
     return minimum_set
 
+def relabel_graph(vertices, edges):
+    """
+    Number the vertices 0..N-1 and the distinct undirected edges
+    0..M-1. The adjacency of each vertex holds (neighbor, edge id,
+    direction) where direction is 1 if the edge is stored as
+    (vertex, neighbor) and -1 if it is stored as (neighbor, vertex).
+    """
+    ordered_vertices = sorted(vertices, key = lambda vertex: vertex.name)
+    ids = {vertex: i for i, vertex in enumerate(ordered_vertices)}
+    endpoints = list({
+        tuple(sorted((ids[edge.vertex1], ids[edge.vertex2])))
+        for edge in edges
+        if edge.vertex1 != edge.vertex2
+    })
+    adjacency = [[] for _ in ordered_vertices]
+    for edge_id, (a, b) in enumerate(endpoints):
+        adjacency[a].append((b, edge_id, 1))
+        adjacency[b].append((a, edge_id, -1))
+    return ordered_vertices, endpoints, adjacency
+
+def find_augmenting_path(adjacency, flows, source, sink):
+    """
+    Breadth-first search for a path from source to sink with
+    spare capacity. Every edge has a capacity of one in either
+    direction, and flows[edge] is the flow along the edge in its
+    stored direction. Returns the (edge id, direction) taken to
+    reach each vertex that was reached.
+    """
+    parents = {source: None}
+    queue = deque([source])
+    while queue and sink not in parents:
+        vertex = queue.popleft()
+        for neighbor, edge_id, direction in adjacency[vertex]:
+            if neighbor not in parents and flows[edge_id] * direction < 1:
+                parents[neighbor] = (vertex, edge_id, direction)
+                queue.append(neighbor)
+    return parents
+
+def find_minimum_cut(vertices, edges, cut_size=3):
+    """
+    Find cut_size edges whose removal splits the graph in two,
+    using Edmonds-Karp max flow on the relabeled graph.
+
+    The source is the first vertex with more than cut_size edges, so
+    that it can never be cut off on its own, and every other vertex
+    is tried once as the sink. If the sink is on the other side of
+    the cut, at most cut_size augmenting paths can be found, and the
+    vertices that can still be reached from the source after that
+    form one side of the cut. If more paths are found, the sink is
+    on the same side and the next sink is tried. A cut that leaves
+    the sink alone on its side, because it has only cut_size edges,
+    is skipped. With two sides of similar size, only a few sinks are
+    needed. Raises ValueError when no sink gives a cut.
+
+    Returns the cut edges and the sizes of the two sides.
+    """
+    ordered_vertices, endpoints, adjacency = relabel_graph(vertices, edges)
+    n_vertices = len(ordered_vertices)
+    source = next(
+        (vertex for vertex in range(n_vertices) if len(adjacency[vertex]) > cut_size),
+        0,
+    )
+    for sink in range(n_vertices):
+        if sink == source:
+            continue
+        flows = [0] * len(endpoints)
+        n_paths = 0
+        while n_paths <= cut_size:
+            parents = find_augmenting_path(adjacency, flows, source, sink)
+            if sink not in parents:
+                break
+            vertex = sink
+            while parents[vertex] is not None:
+                vertex, edge_id, direction = parents[vertex]
+                flows[edge_id] += direction
+            n_paths += 1
+        if n_paths != cut_size:
+            continue
+        # parents holds the vertices still reachable from the source
+        side = parents.keys()
+        if min(len(side), n_vertices - len(side)) == 1:
+            # trivial cut around a single vertex
+            continue
+        cut = {
+            Edge(ordered_vertices[a], ordered_vertices[b])
+            for a, b in endpoints
+            if (a in side) != (b in side)
+        }
+        return cut, (len(side), n_vertices - len(side))
+    raise ValueError(f"no cut of {cut_size} edges splits the graph")
+
 if __name__ == "__main__":
     vertices, graph = read_input(sys.argv[1])
     edges = set()
     for vertex, neighbors in graph.items():
         for neighbor in neighbors:
             edges.add(Edge(vertex, neighbor))
-    mst = minimum_spanning_tree(vertices, edges)
-    interchangeable_edges = find_smallest_set_of_interchangeable_edges(
-        vertices,
-        edges,
-        mst,
-    )
-    print(interchangeable_edges)
-    disjoint_sets = DisjointSets.from_vertices_and_edges(
-        vertices,
-        mst.difference(interchangeable_edges),
-    )
-    print(disjoint_sets.get_set_sizes())
\ No newline at end of file
+    cut, sizes = find_minimum_cut(vertices, edges)
+    print(cut)
+    print(sizes[0] * sizes[1])